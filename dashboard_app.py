@@ -2,6 +2,7 @@ import streamlit as st
 import pandas as pd
 import altair as alt
 import os
+import zlib # For stable per-company random seeds
 import numpy as np
 from datetime import datetime, timedelta
 import bcrypt # For password hashing
@@ -128,6 +129,112 @@ COMPANY_TAB_KPIS = {
     }
 }
 
+# KPIs where a lower value is better. Used for the snapshot delta colors; their
+# SCORECARD_KPI_TARGETS bands below run from a high "worst" to a low "best" value.
+LOWER_IS_BETTER_KPIS = [
+    'Expenses', 'Cost per MW Installed', 'System Loss Rate (%)', 'Average Outage Duration (SAIDI)',
+    'Customer Complaints Resolution Time (days)', 'Operational Expenditure per kWh',
+    'Non-Revenue Water (NRW %)', 'Average Water Outage Duration', 'Energy Cost per m³ Water Produced',
+    'Average Length of Stay (ALOS)', 'Surgery Turnaround Time', 'Mortality Rate', '% of Expired Stock',
+    'Days of Inventory Held', 'Transportation Delivery Time (Avg. days)', 'Procurement Lead Time (Avg. days)'
+]
+
+# Composite scorecard configuration.
+# Each tab KPI is mapped onto 0-100 attainment against a (worst, best) benchmark band:
+# values at or beyond "worst" score 0, at or beyond "best" score 100, linear in between.
+# The direction comes from the band (best < worst means lower is better), so KPIs in
+# any unit share one scale. Bands are benchmarks for the synthetic data; replace them
+# with the entities' official targets when real data is integrated.
+SCORECARD_KPI_TARGETS = {
+    "EUCL": {
+        'Electricity Access Rate (%)': (50.0, 100.0),
+        'System Loss Rate (%)': (25.0, 10.0),
+        'Average Outage Duration (SAIDI)': (15.0, 2.0),
+        'Customer Complaints Resolution Time (days)': (5.0, 1.0),
+        'Billing Efficiency (%)': (85.0, 100.0),
+        'Collection Efficiency (%)': (80.0, 100.0),
+        'Number of New Connections (per quarter)': (500.0, 3500.0),
+        'Operational Expenditure per kWh': (0.12, 0.05),
+        'Revenue per kWh Sold': (0.10, 0.20)
+    },
+    "EDCL": {
+        'New Generation Capacity Developed (MW)': (0.0, 300.0),
+        'Projects Delivered On-Time (%)': (60.0, 100.0),
+        '% of Funds Disbursed (Capex)': (40.0, 100.0),
+        'Cost per MW Installed': (2_000_000.0, 1_000_000.0),
+        'Loan Absorption Rate (%)': (50.0, 100.0)
+    },
+    "WASAC": {
+        'Water Coverage Rate (%)': (50.0, 100.0),
+        'Non-Revenue Water (NRW %)': (45.0, 20.0),
+        'Average Water Outage Duration': (20.0, 4.0),
+        '% of Water Quality Tests Passed': (95.0, 100.0),
+        'Sewerage Network Coverage (%)': (0.0, 30.0)
+    },
+    "King Faisal Hospital": {
+        'Bed Occupancy Rate (%)': (60.0, 85.0), # See SCORECARD_KPI_UPPER_BANDS for overcrowding
+        'Average Length of Stay (ALOS)': (7.0, 4.0),
+        'Outpatient Visits per Month': (4000.0, 9000.0),
+        'Mortality Rate': (3.0, 1.0),
+        'Patient Satisfaction Score': (3.0, 5.0),
+        'Insurance Claims Reimbursement Rate (%)': (80.0, 100.0)
+    },
+    "Rwanda Medical Supply": {
+        'Stock Availability Rate (%)': (80.0, 100.0),
+        'Order Fulfillment Rate (%)': (85.0, 100.0),
+        'Inventory Turnover Ratio': (4.0, 12.0),
+        '% of Expired Stock': (3.0, 0.0),
+        'Revenue': (8_000_000.0, 15_000_000.0),
+        'Expenses': (12_000_000.0, 6_000_000.0),
+        'EBITDA': (0.0, 5_000_000.0),
+        'Health Facility Satisfaction Score': (3.0, 5.0)
+    }
+}
+
+# KPIs that should stay within a band rather than keep rising: (best, worst) above the
+# SCORECARD_KPI_TARGETS band, with attainment falling from 100 at "best" to 0 at "worst"
+SCORECARD_KPI_UPPER_BANDS = {
+    "King Faisal Hospital": {
+        'Bed Occupancy Rate (%)': (85.0, 100.0)
+    }
+}
+
+# Weight of each tab KPI within its company's KPI score. Tab KPIs with a target band
+# but no weight here count with weight 1.0.
+SCORECARD_KPI_WEIGHTS = {
+    "EUCL": {
+        'Electricity Access Rate (%)': 2.0, 'System Loss Rate (%)': 2.0, 'Average Outage Duration (SAIDI)': 2.0,
+        'Customer Complaints Resolution Time (days)': 1.0, 'Billing Efficiency (%)': 1.0,
+        'Collection Efficiency (%)': 1.0, 'Number of New Connections (per quarter)': 1.0,
+        'Operational Expenditure per kWh': 1.0, 'Revenue per kWh Sold': 1.0
+    },
+    "EDCL": {
+        'New Generation Capacity Developed (MW)': 2.0, 'Projects Delivered On-Time (%)': 2.0,
+        '% of Funds Disbursed (Capex)': 2.0, 'Cost per MW Installed': 1.0, 'Loan Absorption Rate (%)': 1.0
+    },
+    "WASAC": {
+        'Water Coverage Rate (%)': 2.0, 'Non-Revenue Water (NRW %)': 2.0, 'Average Water Outage Duration': 2.0,
+        '% of Water Quality Tests Passed': 1.0, 'Sewerage Network Coverage (%)': 1.0
+    },
+    "King Faisal Hospital": {
+        'Bed Occupancy Rate (%)': 2.0, 'Average Length of Stay (ALOS)': 2.0, 'Outpatient Visits per Month': 2.0,
+        'Mortality Rate': 1.0, 'Patient Satisfaction Score': 1.0, 'Insurance Claims Reimbursement Rate (%)': 1.0
+    },
+    "Rwanda Medical Supply": {
+        'Stock Availability Rate (%)': 2.0, 'Order Fulfillment Rate (%)': 2.0, 'Inventory Turnover Ratio': 2.0,
+        '% of Expired Stock': 1.0, 'Revenue': 1.0, 'Expenses': 1.0, 'EBITDA': 1.0,
+        'Health Facility Satisfaction Score': 1.0
+    }
+}
+
+# Governance metrics (already on a 0-100 scale) and their weight within the governance part
+SCORECARD_GOVERNANCE_WEIGHTS = {
+    'Board Completeness (%)': 1.0,
+    'Internal Audit Score (%)': 1.0
+}
+# Fixed share of the composite score taken by governance, independent of how many KPIs a company has
+SCORECARD_GOVERNANCE_SHARE = 0.25
+
 
 # --- Helper Function for Visualization ---
 def create_line_chart(df, x_col, y_col, title, y_format=',.2f', target_value=None, line_color=None, x_axis_type='T'):
@@ -213,11 +320,14 @@ def load_all_kpi_data():
                 else:
                     years_in_data = range(2020, current_year + 1) # Default years if no data yet
 
+                # Seeded per company so reloads yield identical governance frames and the
+                # per-company scorecard cache is only invalidated when that company's data changes
+                governance_rng = np.random.default_rng(zlib.crc32(company_name.encode('utf-8')))
                 governance_data = []
                 for year in years_in_data:
-                    board_completeness = np.clip(np.random.normal(95, 3), 80, 100)
-                    audit_opinion = np.random.choice([1, 0], p=[0.9, 0.1]) # 1 for Clean, 0 for Qualified
-                    internal_audit_score = np.clip(np.random.normal(80, 7), 60, 100)
+                    board_completeness = np.clip(governance_rng.normal(95, 3), 80, 100)
+                    audit_opinion = governance_rng.choice([1, 0], p=[0.9, 0.1]) # 1 for Clean, 0 for Qualified
+                    internal_audit_score = np.clip(governance_rng.normal(80, 7), 60, 100)
                     
                     governance_data.append({
                         'Year': year,
@@ -271,6 +381,116 @@ def load_all_kpi_data():
             data_dict[f"{company_name}_Governance"] = pd.DataFrame() # Ensure a DataFrame exists even if empty
     return data_dict
 
+
+# --- Composite KPI Scorecard ---
+def get_scorecard_kpis(company_name, available_columns):
+    """Returns {kpi_name: weight} for the tab KPIs of a company that have a target band and exist in its data."""
+    company_targets = SCORECARD_KPI_TARGETS.get(company_name, {})
+    company_weights = SCORECARD_KPI_WEIGHTS.get(company_name, {})
+    kpi_weights = {}
+    for tab_kpis in COMPANY_TAB_KPIS[company_name].values():
+        for kpi_name in tab_kpis:
+            if kpi_name in company_targets and kpi_name in available_columns:
+                kpi_weights[kpi_name] = company_weights.get(kpi_name, 1.0)
+    return kpi_weights
+
+def weighted_row_mean(values, weights):
+    """Weighted mean of each row of a 2D array, ignoring NaNs (NaN where a row has no values)."""
+    valid = ~np.isnan(values)
+    weight_totals = valid.astype(float) @ weights
+    weighted_sums = np.where(valid, values, 0.0) @ weights
+    return np.divide(weighted_sums, weight_totals, out=np.full(len(weighted_sums), np.nan), where=weight_totals > 0)
+
+# Cached per company: Streamlit hashes the DataFrame arguments, so when one company's
+# data changes only that company's scores are recomputed on the next run. No ttl here,
+# since the result depends only on the arguments (the governance frames are seeded and
+# stay the same across reloads of load_all_kpi_data).
+@st.cache_data(max_entries=len(COMPANIES) * 4)
+def compute_company_scorecard(company_name, df, governance_df):
+    """
+    Computes a composite performance score (0-100) for every period of one company.
+    Each KPI is scored as attainment against its SCORECARD_KPI_TARGETS band, and the
+    weighted KPI average is blended with the governance metrics using SCORECARD_GOVERNANCE_SHARE.
+    """
+    if df.empty or 'Date' not in df.columns:
+        return pd.DataFrame(columns=['Date', 'Company', 'Composite Score'])
+
+    kpi_weights = get_scorecard_kpis(company_name, df.columns)
+    kpi_names = list(kpi_weights)
+
+    # One row per period (duplicate rows for the same month are averaged)
+    periods_df = df.groupby('Date')[kpi_names].mean().sort_index()
+    values = periods_df.to_numpy(dtype=float) # Shape: periods x KPIs
+
+    # Attainment against each KPI's (worst, best) band; best < worst flips the direction
+    bands = np.array([SCORECARD_KPI_TARGETS[company_name][kpi_name] for kpi_name in kpi_names], dtype=float).reshape(-1, 2)
+    attainment = np.clip((values - bands[:, 0]) / (bands[:, 1] - bands[:, 0]), 0, 1)
+
+    # KPIs with an upper band lose attainment again above its "best" value
+    company_upper_bands = SCORECARD_KPI_UPPER_BANDS.get(company_name, {})
+    has_upper_band = np.array([kpi_name in company_upper_bands for kpi_name in kpi_names], dtype=bool)
+    if has_upper_band.any():
+        upper_bands = np.array([company_upper_bands.get(kpi_name, (np.nan, np.nan)) for kpi_name in kpi_names], dtype=float)
+        upper_attainment = np.divide(
+            upper_bands[:, 1] - values, upper_bands[:, 1] - upper_bands[:, 0],
+            out=np.ones_like(values), where=has_upper_band
+        )
+        attainment = np.minimum(attainment, np.clip(upper_attainment, 0, 1))
+
+    kpi_scores = weighted_row_mean(attainment, np.array([kpi_weights[kpi_name] for kpi_name in kpi_names], dtype=float))
+
+    # Governance is yearly: broadcast each year's values onto its monthly periods
+    gov_cols = [col for col in SCORECARD_GOVERNANCE_WEIGHTS if col in governance_df.columns]
+    if gov_cols:
+        gov_values = governance_df.set_index('Year')[gov_cols].reindex(periods_df.index.year).to_numpy(dtype=float)
+        gov_scores = weighted_row_mean(
+            np.clip(gov_values / 100.0, 0, 1),
+            np.array([SCORECARD_GOVERNANCE_WEIGHTS[col] for col in gov_cols], dtype=float)
+        )
+    else:
+        gov_scores = np.full(len(periods_df), np.nan)
+
+    # Blend the two parts with fixed shares; a period missing one part is scored on the other alone
+    part_scores = np.column_stack([kpi_scores, gov_scores])
+    part_shares = np.array([1.0 - SCORECARD_GOVERNANCE_SHARE, SCORECARD_GOVERNANCE_SHARE])
+    scores = weighted_row_mean(part_scores, part_shares) * 100
+
+    return pd.DataFrame({'Date': periods_df.index, 'Company': company_name, 'Composite Score': scores})
+
+def build_scorecard_matrix(data_dict):
+    """Returns composite scores as a periods x companies DataFrame (Date index, one column per company)."""
+    score_frames = [
+        compute_company_scorecard(
+            company_name,
+            data_dict.get(company_name, pd.DataFrame()),
+            data_dict.get(f"{company_name}_Governance", pd.DataFrame())
+        )
+        for company_name in COMPANIES
+    ]
+    scores_long = pd.concat(score_frames, ignore_index=True)
+    if scores_long.empty:
+        return pd.DataFrame(columns=list(COMPANIES))
+    # Empty frames from companies without data would otherwise leave these columns as object dtype
+    scores_long['Date'] = pd.to_datetime(scores_long['Date'])
+    scores_long['Composite Score'] = scores_long['Composite Score'].astype(float)
+    return scores_long.pivot(index='Date', columns='Company', values='Composite Score').reindex(columns=list(COMPANIES))
+
+def build_scorecard_leaderboard(score_matrix, scored_kpis):
+    """
+    Ranks companies by their average composite score over the periods in score_matrix.
+    scored_kpis maps each company to the KPI names that went into its score.
+    """
+    period_ranks = score_matrix.rank(axis=1, ascending=False, method='min')
+    leaderboard = pd.DataFrame({
+        'Company': score_matrix.columns,
+        'Composite Score': score_matrix.mean().to_numpy(),
+        'Latest Score': score_matrix.ffill().iloc[-1].to_numpy(),
+        'Periods Ranked #1': (period_ranks == 1).sum().to_numpy(),
+        'KPIs Scored': [', '.join(scored_kpis.get(company_name, [])) for company_name in score_matrix.columns]
+    })
+    leaderboard.insert(0, 'Rank', leaderboard['Composite Score'].rank(ascending=False, method='min').astype('Int64'))
+    return leaderboard.sort_values('Rank', na_position='last').reset_index(drop=True)
+
 # Load the data
 all_kpi_data = load_all_kpi_data()
 
@@ -497,13 +717,8 @@ else: # --- Dashboard Content (Only visible if authenticated) ---
                             )
                             if delta is not None:
                                 delta_str = format_currency_value(delta)
-                                delta_color_style = ""
-                                if (kpi_name in ['Revenue', 'EBITDA'] and delta >= 0) or \
-                                   (kpi_name in ['Expenses', 'Cost per MW Installed'] and delta <= 0):
-                                    delta_color_style = "color: green;"
-                                elif (kpi_name in ['Revenue', 'EBITDA'] and delta < 0) or \
-                                     (kpi_name in ['Expenses', 'Cost per MW Installed'] and delta > 0):
-                                    delta_color_style = "color: red;"
+                                improved = delta <= 0 if kpi_name in LOWER_IS_BETTER_KPIS else delta >= 0
+                                delta_color_style = "color: green;" if improved else "color: red;"
 
                                 cols[col_index % 4].markdown(
                                     f"<p style='font-size: 0.9em; {delta_color_style}; margin-top: 0px;'>Δ {delta_str} Frw</p>",
@@ -513,23 +728,18 @@ else: # --- Dashboard Content (Only visible if authenticated) ---
                             current_value = latest_data[kpi_name]
                             previous_value = df_selected.iloc[-2][kpi_name] if len(df_selected) > 1 else None
                             delta = current_value - previous_value if previous_value is not None else None
+                            # "inverse" shows an increase in red, for KPIs where lower is better
+                            delta_color_option = "inverse" if kpi_name in LOWER_IS_BETTER_KPIS else "normal"
 
                             if '%' in kpi_name or 'Rate' in kpi_name or 'Efficiency' in kpi_name or 'Compliance' in kpi_name:
                                 current_value_formatted = f"{current_value:.1f}%"
                                 delta_formatted = f"{delta:.1f}%" if delta is not None else None
-                                delta_color_option = "normal" if delta >= 0 else "inverse" if delta < 0 else "off"
-                            elif 'System Loss Rate (%)' in kpi_name or 'Average Outage Duration (SAIDI)' in kpi_name or 'Non-Revenue Water (NRW %)' in kpi_name or '% of Expired Stock' in kpi_name or 'Average Length of Stay (ALOS)' in kpi_name or 'Mortality Rate' in kpi_name or 'Customer Complaints Resolution Time (days)' in kpi_name or 'Transportation Delivery Time (Avg. days)' in kpi_name or 'Procurement Lead Time (Avg. days)' in kpi_name:
-                                current_value_formatted = f"{current_value:,.1f}" if 'Rate' not in kpi_name else f"{current_value:,.1f}%"
-                                delta_formatted = f"{delta:,.1f}" if delta is not None else None
-                                delta_color_option = "inverse" if delta > 0 else "normal" if delta < 0 else "off"
                             elif 'MW' in kpi_name or 'km' in kpi_name or 'Number' in kpi_name or 'Count' in kpi_name:
                                 current_value_formatted = f"{current_value:,.0f}"
                                 delta_formatted = f"{delta:,.0f}" if delta is not None else None
-                                delta_color_option = "normal" if delta >= 0 else "inverse" if delta < 0 else "off"
                             else:
                                 current_value_formatted = f"{current_value:,.1f}"
                                 delta_formatted = f"{delta:,.1f}" if delta is not None else None
-                                delta_color_option = "normal" if delta >= 0 else "inverse" if delta < 0 else "off"
 
                             cols[col_index % 4].metric(
                                 label=kpi_name,
@@ -661,6 +871,60 @@ else: # --- Dashboard Content (Only visible if authenticated) ---
         st.info("No governance data available for the selected company or year.")
 
 
+    # --- Composite Scorecard Leaderboard (all companies) ---
+    st.markdown("---")
+    st.markdown(f"<h3 style='color: {company_color};'>Composite Scorecard Leaderboard</h3>", unsafe_allow_html=True)
+    score_matrix = build_scorecard_matrix(all_kpi_data)
+
+    # Apply the same year and date range filters as the company view
+    if not score_matrix.empty and selected_year_str != 'All Years':
+        score_matrix = score_matrix[score_matrix.index.year == int(selected_year_str)]
+    if not score_matrix.empty and not df_selected.empty:
+        score_matrix = score_matrix[(score_matrix.index >= date_range[0]) & (score_matrix.index <= date_range[1])]
+
+    if not score_matrix.dropna(how='all').empty:
+        scored_kpis = {
+            company_name: list(get_scorecard_kpis(company_name, all_kpi_data.get(company_name, pd.DataFrame()).columns))
+            for company_name in COMPANIES
+        }
+        leaderboard = build_scorecard_leaderboard(score_matrix, scored_kpis)
+        company_colors = alt.Scale(
+            domain=list(COMPANIES.keys()),
+            range=[COMPANY_BRANDING[company_name]["primary_color"] for company_name in COMPANIES]
+        )
+
+        leaderboard_chart = alt.Chart(leaderboard.dropna(subset=['Composite Score'])).mark_bar().encode(
+            x=alt.X('Composite Score:Q', title='Composite Score (0-100)', scale=alt.Scale(domain=[0, 100])),
+            y=alt.Y('Company:N', sort='-x', title='Company'),
+            color=alt.Color('Company:N', scale=company_colors, legend=None),
+            tooltip=['Rank', 'Company', alt.Tooltip('Composite Score:Q', format=',.1f'), alt.Tooltip('Latest Score:Q', format=',.1f')]
+        ).properties(
+            title=f"Average Composite Score ({selected_year_str})"
+        )
+        st.altair_chart(leaderboard_chart, use_container_width=True)
+        st.dataframe(leaderboard.round({'Composite Score': 1, 'Latest Score': 1}), hide_index=True, use_container_width=True)
+
+        score_trend_df = score_matrix.reset_index().melt(id_vars='Date', var_name='Company', value_name='Composite Score').dropna()
+        score_trend_chart = alt.Chart(score_trend_df).mark_line(point=True).encode(
+            x=alt.X('Date:T', title='Date'),
+            y=alt.Y('Composite Score:Q', title='Composite Score (0-100)'),
+            color=alt.Color('Company:N', scale=company_colors),
+            tooltip=['Date', 'Company', alt.Tooltip('Composite Score:Q', format=',.1f')]
+        ).properties(
+            title='Composite Score Trend by Company'
+        ).interactive()
+        st.altair_chart(score_trend_chart, use_container_width=True)
+        st.caption(
+            "Each tab KPI is scored 0-100 as attainment against its benchmark band (worst to best; "
+            "lower-is-better KPIs have a band that runs downwards) and averaged with per-company weights "
+            "(1.0 where none is set; KPIs missing from a company's data are skipped, see 'KPIs Scored'). "
+            f"The result is blended with Board Completeness and Internal Audit Score at a fixed "
+            f"{SCORECARD_GOVERNANCE_SHARE:.0%} governance share."
+        )
+    else:
+        st.info("No scorecard data available for the selected year or date range.")
+
+
     st.markdown("---")
     st.info("This dashboard uses **synthetic data** for demonstration purposes. "
             "Actual data would be integrated upon request and secure access.")